@@ -3,15 +3,15 @@
  * Application pour surveiller les mises à jour des images Docker et envoyer des notifications via Gotify
  */
 
+// Chargement des variables d'environnement avant tout autre import:
+// les services lisent process.env au moment de leur import, donc dotenv
+// doit être évalué en premier (les imports ESM sont hissés avant le code)
+import 'dotenv/config';
 import { CronJob } from 'cron';
-import dotenv from 'dotenv';
 import { notificationService } from './services/notification.js';
 import { dockerVersionService } from './services/docker_version.js';
 import { stateService } from './services/state.js';
 
-// Chargement des variables d'environnement
-dotenv.config();
-
 // Configuration de l'intervalle de vérification (par défaut: tous les jours à minuit)
 const CHECK_INTERVAL = process.env.CHECK_INTERVAL || '0 0 */24 * * *';
 
@@ -31,16 +31,9 @@ async function checkDockerVersions() {
       // Délégation de la notification au service approprié
       await notificationService.notifyMultipleUpdates(updates);
       
-      // Mise à jour de l'état pour toutes les images notifiées
-      for (const update of updates) {
-        stateService.updateImageState(update.image, {
-          containerName: update.containerName,
-          image: update.image,
-          currentTag: update.currentTag,
-          latestVersion: update.latestVersion,
-          lastUpdated: update.lastUpdated
-        });
-      }
+      // Mise à jour de l'état pour toutes les images notifiées en une
+      // seule écriture du fichier d'état
+      stateService.updateImageStates(updates);
     } else {
       console.log('Aucune mise à jour à notifier.');
     }
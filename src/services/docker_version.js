@@ -4,20 +4,347 @@
  */
 import Docker from 'dockerode';
 import axios from 'axios';
+import semver from 'semver';
+import fs from 'fs';
+import path from 'path';
+import http from 'http';
+import https from 'https';
 import { stateService } from './state.js';
-import { notificationService } from './notification.js';
+
+// Nombre maximum de vérifications simultanées auprès de Docker Hub
+// (limité pour respecter les limites secondaires de l'API)
+const MAX_CONCURRENT_CHECKS = parseInt(process.env.MAX_CONCURRENT_CHECKS || '10', 10);
+
+// Images à ignorer complètement (noms exacts, sans tag, séparés par des
+// virgules dans IGNORED_IMAGES)
+const IGNORED_IMAGES = new Set(
+    (process.env.IGNORED_IMAGES || '')
+        .split(',')
+        .map(name => name.trim())
+        .filter(name => name.length > 0)
+);
+
+// Journalisation détaillée du parcours des conteneurs et des pages de tags
+// Activée par défaut; VERBOSE_LOGS=false la coupe, ce qui évite autant
+// d'écritures synchrones sur stdout par cycle
+const VERBOSE_LOGS = process.env.VERBOSE_LOGS !== 'false';
+
+/**
+ * Journalise uniquement lorsque les logs détaillés sont activés
+ * @param {...*} args - Arguments passés à console.log
+ */
+function logVerbose(...args) {
+    if (VERBOSE_LOGS) {
+        console.log(...args);
+    }
+}
+
+// Taille du pool de connexions vers Docker Hub
+// Par défaut alignée sur la concurrence des vérifications, mais ajustable
+// indépendamment (utile si la limite de concurrence est relevée)
+const HUB_MAX_SOCKETS = parseInt(process.env.HUB_MAX_SOCKETS || String(MAX_CONCURRENT_CHECKS), 10);
+
+// Client HTTP partagé pour les appels à Docker Hub, avec connexions
+// persistantes (keep-alive): les requêtes successives réutilisent la même
+// connexion TLS au lieu de payer un handshake complet à chaque appel
+// maxFreeSockets garde quelques connexions chaudes entre deux cycles de vérification
+const hubAgentOptions = {
+    keepAlive: true,
+    maxSockets: HUB_MAX_SOCKETS,
+    maxFreeSockets: Math.min(HUB_MAX_SOCKETS, 5)
+};
+const hubClient = axios.create({
+    httpAgent: new http.Agent(hubAgentOptions),
+    httpsAgent: new https.Agent(hubAgentOptions)
+});
+
+// Nombre maximum de nouvelles tentatives en cas de limitation par l'API (429/503)
+const HUB_MAX_RETRIES = parseInt(process.env.HUB_MAX_RETRIES || '3', 10);
+
+// Nombre de tags récupérés par page sur l'endpoint /tags
+// Une valeur plus grande réduit le nombre de requêtes nécessaires pour
+// trouver un tag valable, au prix de réponses plus volumineuses
+// 25 suffit généralement à trouver un tag numéroté dès la première page
+const TAGS_PAGE_SIZE = parseInt(process.env.TAGS_PAGE_SIZE || '25', 10);
+
+// Plafond de pagination: nombre maximum de pages /tags parcourues par dépôt
+// Le couple TAGS_PAGE_SIZE x TAGS_MAX_PAGES borne le budget de requêtes
+// consacré à un dépôt sans tag numéroté facilement trouvable
+const TAGS_MAX_PAGES = parseInt(process.env.TAGS_MAX_PAGES || '5', 10);
+
+// Durée de vie des réponses /tags en cache (en secondes) et taille maximale du cache
+const HUB_CACHE_TTL_MS = parseInt(process.env.HUB_CACHE_TTL || '600', 10) * 1000;
+const HUB_CACHE_MAX_SIZE = 500;
+
+// TTL plus court pour les résultats négatifs (dépôt introuvable): un dépôt
+// peut apparaître sur Docker Hub, inutile de mémoriser son absence longtemps
+const HUB_NEGATIVE_CACHE_TTL_MS = parseInt(process.env.HUB_NEGATIVE_CACHE_TTL || '60', 10) * 1000;
+
+// Patterns précompilés (une seule fois, au chargement du module) pour
+// identifier les tags numérotés
+// Exemples: 1.0, v1.0, 1.0.0, v1.0.0, 1.0.0-alpha, 1, v1, etc.
+const VERSION_PATTERNS = [
+    /^v?\d+(\.\d+)*(-[a-zA-Z0-9._-]+)?$/, // Format standard: 1.0.0, v1.0.0, 1.0.0-alpha
+    /^\d{4}\.\d{2}(\.\d+)?$/, // Format date: 2023.01, 2023.01.1
+    /^\d{8}$/ // Format date compact: 20230101
+];
+
+// Détection de la présence de lettres dans un tag, compilée une seule fois
+// (sert à distinguer les tags purement numériques des tags avec variante)
+const HAS_LETTERS_RE = /[a-zA-Z]/;
+
+// Tags courants qui ne sont jamais des versions numérotées:
+// rejet immédiat sans passer par les expressions régulières
+const NON_VERSION_TAGS = new Set([
+    'latest', 'stable', 'edge', 'main', 'master',
+    'nightly', 'dev', 'develop', 'alpha', 'beta', 'rc'
+]);
+
+/**
+ * Vérifie si un tag est numéroté et utilisable comme version
+ * @param {string} tagName - Nom du tag à tester
+ * @returns {boolean} - True si le tag correspond à un format de version connu
+ */
+function isVersionTag(tagName) {
+    // Court-circuit sur les tags "mots-clés" connus
+    if (NON_VERSION_TAGS.has(tagName.toLowerCase())) {
+        return false;
+    }
+
+    // Vérifie si le tag correspond à l'un des patterns
+    return VERSION_PATTERNS.some(pattern => pattern.test(tagName));
+}
+
+// Cache partagé des versions semver analysées, commun au tri et à la
+// recherche de maximum; borné pour ne pas croître indéfiniment sur un
+// processus qui tourne des semaines
+const COERCE_CACHE_MAX_SIZE = 4096;
+const coerceCache = new Map();
+
+/**
+ * Analyse un nom de tag en version semver, avec mémoïsation
+ * @param {string} name - Nom du tag
+ * @returns {Object|null} - Version semver ou null si le tag n'est pas interprétable
+ */
+function coerceVersion(name) {
+    if (coerceCache.has(name)) {
+        return coerceCache.get(name);
+    }
+
+    const version = semver.coerce(name);
+    if (coerceCache.size >= COERCE_CACHE_MAX_SIZE) {
+        coerceCache.delete(coerceCache.keys().next().value);
+    }
+    coerceCache.set(name, version);
+    return version;
+}
+
+// Cache des chemins de dépôt normalisés, calculés une seule fois par image
+const repoPathCache = new Map();
+
+// Cache des URLs de première page /tags, construites une seule fois par
+// dépôt (elles ne dépendent que de l'image et de la taille de page)
+const tagsUrlCache = new Map();
+
+/**
+ * Construit (ou réutilise) l'URL de la première page de tags d'un dépôt
+ * @param {string} repoPath - Chemin normalisé du dépôt
+ * @param {number} pageSize - Taille de page demandée
+ * @returns {string} - URL de la première page de l'endpoint /tags
+ */
+function tagsUrlFor(repoPath, pageSize) {
+    const key = `${repoPath}|${pageSize}`;
+    let url = tagsUrlCache.get(key);
+    if (!url) {
+        url = `https://registry.hub.docker.com/v2/repositories/${repoPath}/tags?page_size=${pageSize}&ordering=last_updated`;
+        tagsUrlCache.set(key, url);
+    }
+    return url;
+}
+
+/**
+ * Normalise le chemin d'un dépôt Docker Hub
+ * Les images officielles (sans namespace) vivent sous "library/"
+ * @param {string} image - Nom de l'image tel que rapporté par Docker
+ * @returns {string} - Chemin du dépôt utilisable dans les URLs de l'API
+ */
+function normalizeRepoPath(image) {
+    let repoPath = repoPathCache.get(image);
+    if (!repoPath) {
+        repoPath = image.includes('/') ? image : `library/${image}`;
+        repoPathCache.set(image, repoPath);
+    }
+    return repoPath;
+}
+
+// Variantes de distribution connues dans les suffixes de tags, consultables
+// en O(1); seuls ces suffixes sont traités comme de vraies variantes
+// (un "-alpha" ou "-rc1" est une pré-version, pas une variante)
+const KNOWN_VARIANT_SUFFIXES = new Set([
+    'alpine', 'slim', 'bullseye', 'bookworm', 'buster', 'stretch',
+    'jammy', 'focal', 'noble', 'ubi', 'management', 'perl',
+    'apache', 'fpm', 'cli'
+]);
+
+// Partie alphabétique initiale d'un suffixe (ex: "alpine" dans "alpine3.19")
+const VARIANT_BASE_RE = /^[a-zA-Z]+/;
+
+/**
+ * Extrait la variante de distribution d'un nom de tag, s'il en porte une
+ * @param {string} tagName - Nom du tag (ex: "1.25-alpine3.19")
+ * @returns {string|null} - Variante normalisée en minuscules, ou null
+ */
+function extractVariant(tagName) {
+    const dashIndex = tagName.indexOf('-');
+    if (dashIndex === -1) {
+        return null;
+    }
+
+    // Le suffixe peut être versionné (ex: alpine3.19): seule la partie
+    // alphabétique est comparée à la liste des variantes connues
+    const base = VARIANT_BASE_RE.exec(tagName.substring(dashIndex + 1));
+    if (!base) {
+        return null;
+    }
+
+    const variant = base[0].toLowerCase();
+    return KNOWN_VARIANT_SUFFIXES.has(variant) ? variant : null;
+}
+
+/**
+ * Vérifie qu'un tag propose au moins une image Linux
+ * Certains dépôts publient des tags uniquement Windows, inutilisables ici;
+ * en l'absence d'information sur les plateformes, le tag est accepté
+ * @param {Object} tag - Tag retourné par l'endpoint /tags
+ * @returns {boolean} - True si le tag est utilisable sous Linux
+ */
+function hasLinuxImage(tag) {
+    if (!Array.isArray(tag.images) || tag.images.length === 0) {
+        return true;
+    }
+
+    return tag.images.some(image => image.os === 'linux');
+}
+
+/**
+ * Limiteur de débit de type "token bucket" (seau à jetons)
+ * Contrairement à un délai fixe entre chaque requête, le seau autorise de
+ * courtes rafales (jusqu'à `capacity` requêtes) tout en bornant le débit
+ * moyen à `refillRate` requêtes par seconde
+ */
+class TokenBucket {
+    /**
+     * @param {number} capacity - Nombre maximum de jetons accumulables
+     * @param {number} refillRate - Jetons rechargés par seconde
+     */
+    constructor(capacity = 10, refillRate = 1.0) {
+        this.capacity = capacity;
+        this.refillRate = refillRate;
+        this.tokens = capacity;
+        this.lastRefill = performance.now();
+    }
+
+    /**
+     * Consomme un jeton, en attendant si nécessaire que le seau se recharge
+     */
+    async take() {
+        // Recharge du seau en fonction du temps écoulé
+        // performance.now() est monotone: un ajustement de l'horloge système
+        // (NTP, changement d'heure) ne peut pas fausser le calcul du débit
+        const now = performance.now();
+        const elapsedSeconds = (now - this.lastRefill) / 1000;
+        this.tokens = Math.min(this.capacity, this.tokens + elapsedSeconds * this.refillRate);
+        this.lastRefill = now;
+
+        // Consommation d'un jeton; un solde négatif représente la file d'attente
+        // (la partie synchrone est atomique, donc sûre même avec des appels concurrents)
+        this.tokens -= 1;
+
+        if (this.tokens < 0) {
+            const waitMs = (-this.tokens / this.refillRate) * 1000;
+            await new Promise(resolve => setTimeout(resolve, waitMs));
+        }
+    }
+
+    /**
+     * Ajuste le solde local d'après le budget restant annoncé par le serveur
+     * (en-tête X-RateLimit-Remaining): on ne doit jamais se croire plus riche
+     * que ce que l'API accorde réellement
+     * @param {number} remaining - Nombre de requêtes restantes côté serveur
+     */
+    syncRemaining(remaining) {
+        if (Number.isFinite(remaining) && remaining >= 0 && remaining < this.tokens) {
+            this.tokens = remaining;
+        }
+    }
+}
 
 class DockerService {
     constructor() {
         // Initialisation de la connexion Docker
         // Par défaut, utilise le socket Unix sur Linux
         this.docker = new Docker({socketPath: '/var/run/docker.sock'});
+
+        // Limiteur de débit pour les appels à l'API Docker Hub
+        this.rateLimiter = new TokenBucket(
+            parseInt(process.env.HUB_RATE_CAPACITY || '10', 10),
+            parseFloat(process.env.HUB_RATE_REFILL || '1')
+        );
+
+        // Cache des réponses /tags (clé: URL, valeur: { timestamp, data })
+        // Une Map conserve l'ordre d'insertion, ce qui permet une éviction LRU simple
+        this.tagsCache = new Map();
+
+        // Cache négatif des dépôts introuvables (clé: image, valeur: timestamp du 404)
+        this.missingRepoCache = new Map();
+
+        // Requêtes en cours de traitement (clé: URL, valeur: promesse de réponse)
+        // permettant de regrouper les appels concurrents identiques
+        this.inFlightRequests = new Map();
+
+        // Persistance du cache /tags sur disque: les ETags et réponses survivent
+        // aux redémarrages du processus, comme le fichier d'état du stateService
+        this.cacheDir = process.env.DATA_DIR || path.join(process.cwd(), 'data');
+        this.cacheFile = path.join(this.cacheDir, 'hub_cache.json');
+        this.loadTagsCache();
         
         // Stockage des informations sur le conteneur actuel
         this.currentContainerId = null;
         this.currentContainerName = null;
     }
     
+    /**
+     * Recharge le cache des réponses /tags depuis le disque
+     * Au premier cycle après un redémarrage, les entrées encore fraîches
+     * évitent l'appel réseau et les entrées expirées se revalident par ETag
+     */
+    loadTagsCache() {
+        try {
+            if (fs.existsSync(this.cacheFile)) {
+                const entries = JSON.parse(fs.readFileSync(this.cacheFile, 'utf8'));
+                this.tagsCache = new Map(entries);
+                console.log(`Cache Docker Hub rechargé: ${this.tagsCache.size} entrée(s)`);
+            }
+        } catch (error) {
+            console.error('Erreur lors du chargement du cache Docker Hub:', error);
+        }
+    }
+
+    /**
+     * Sauvegarde le cache des réponses /tags sur disque
+     * Appelée en fin de cycle de vérification
+     */
+    saveTagsCache() {
+        try {
+            if (!fs.existsSync(this.cacheDir)) {
+                fs.mkdirSync(this.cacheDir, { recursive: true });
+            }
+            fs.writeFileSync(this.cacheFile, JSON.stringify([...this.tagsCache]), 'utf8');
+        } catch (error) {
+            console.error('Erreur lors de la sauvegarde du cache Docker Hub:', error);
+        }
+    }
+
     /**
      * Initialise les informations sur le conteneur actuel (ID et nom)
      * Cette fonction est appelée automatiquement lors de la construction de l'objet
@@ -105,121 +432,239 @@ class DockerService {
             
             // Récupération de tous les conteneurs
             const containers = await this.docker.listContainers();
-            console.log(`Nombre de conteneurs trouvés: ${containers.length}`);
+            logVerbose(`Nombre de conteneurs trouvés: ${containers.length}`);
             
             // Transformation des données pour un format plus lisible
-            return containers
-                // Application des filtres
-                .filter(container => {
-                    // Filtre par état (running)
-                    const stateFilter = !running || container.State === 'running';
-                    
-                    // Filtre pour exclure le conteneur actuel
-                    let selfFilter = true;
-                    if (excludeSelf && this.currentContainerId) {
-                        selfFilter = !container.Id.includes(this.currentContainerId);
-                        
-                        // Si on a exclu un conteneur, l'afficher dans les logs
-                        if (!selfFilter) {
-                            console.log(`Conteneur actuel exclu: ${container.Names.map(n => n.replace('/', '')).join(', ')}`);
+            // Filtrage et mise en forme fusionnés en un seul passage, sans
+            // liste intermédiaire entre les deux étapes
+            const results = [];
+
+            for (const container of containers) {
+                // Filtre par état (running)
+                if (running && container.State !== 'running') {
+                    continue;
+                }
+
+                // Filtre pour exclure le conteneur actuel
+                if (excludeSelf && this.currentContainerId && container.Id.includes(this.currentContainerId)) {
+                    console.log(`Conteneur actuel exclu: ${container.Names.map(n => n.replace('/', '')).join(', ')}`);
+                    continue;
+                }
+
+                // Séparation de l'image et du tag en une passe: le tag est ce
+                // qui suit le dernier ':' s'il apparaît après le dernier '/'
+                // (sinon ce ':' appartient au port du registre)
+                const imageRef = container.Image;
+                const sepIndex = imageRef.lastIndexOf(':');
+                let imageName = imageRef;
+                let imageTag = 'latest';
+                if (sepIndex > imageRef.lastIndexOf('/')) {
+                    imageName = imageRef.slice(0, sepIndex);
+                    imageTag = imageRef.slice(sepIndex + 1);
+                }
+
+                // Filtre des images explicitement ignorées (correspondance
+                // exacte en O(1), sans parcours de liste ni sous-chaîne)
+                if (IGNORED_IMAGES.has(imageName)) {
+                    logVerbose(`Image ignorée (IGNORED_IMAGES): ${imageName}`);
+                    continue;
+                }
+
+                // Extraction du nom du conteneur (sans le slash initial)
+                const containerNames = container.Names.map(name => name.replace('/', ''));
+
+                results.push({
+                    id: container.Id.substring(0, 12), // ID court du conteneur
+                    names: containerNames,            // Noms sans le slash
+                    name: containerNames[0] || '',    // Premier nom (principal)
+                    imageWithTag: container.Image,    // Image complète avec tag
+                    image: imageName,                // Nom de l'image sans tag
+                    tag: imageTag,                   // Tag de l'image
+                    state: container.State,          // État du conteneur
+                    status: container.Status         // Statut détaillé du conteneur
+                });
+            }
+
+            return results;
+        } catch (error) {
+            console.error('Erreur lors de la récupération des conteneurs:', error);
+            throw error;
+        }
+    }
+
+    /**
+     * Récupère le digest du dépôt distant associé à une image locale
+     * @param {string} imageWithTag - Référence de l'image locale (avec tag)
+     * @returns {string|null} - Digest (sha256:...) ou null s'il est indisponible
+     */
+    async getLocalImageDigest(imageWithTag) {
+        try {
+            const imageInfo = await this.docker.getImage(imageWithTag).inspect();
+            const repoDigest = (imageInfo.RepoDigests || []).find(entry => entry.includes('@'));
+            return repoDigest ? repoDigest.split('@')[1] : null;
+        } catch (error) {
+            // Image absente localement ou démon inaccessible: pas bloquant
+            return null;
+        }
+    }
+
+    /**
+     * Exécute un traitement asynchrone sur une liste d'éléments avec un nombre
+     * limité de tâches simultanées
+     * @param {Array} items - Éléments à traiter
+     * @param {number} limit - Nombre maximum de tâches simultanées
+     * @param {Function} worker - Fonction asynchrone appliquée à chaque élément
+     * @returns {Array} - Résultats dans l'ordre des éléments d'entrée
+     */
+    async runWithConcurrency(items, limit, worker) {
+        const results = new Array(items.length);
+        let nextIndex = 0;
+
+        // Création d'un petit pool de "workers" qui consomment les éléments au fur et à mesure
+        const workers = Array.from({ length: Math.min(limit, items.length) }, async () => {
+            while (nextIndex < items.length) {
+                const index = nextIndex++;
+                results[index] = await worker(items[index], index);
+            }
+        });
+
+        await Promise.all(workers);
+        return results;
+    }
+
+    /**
+     * Regroupe les conteneurs par image (sans tag)
+     * @param {Array} containers - Conteneurs retournés par listContainers
+     * @returns {Map<string, Array>} - Image -> conteneurs qui l'utilisent
+     */
+    groupContainersByImage(containers) {
+        const byImage = new Map();
+
+        for (const container of containers) {
+            const group = byImage.get(container.image);
+            if (group) {
+                group.push(container);
+            } else {
+                byImage.set(container.image, [container]);
+            }
+        }
+
+        return byImage;
+    }
+
+    /**
+     * Analyse un conteneur et détermine si une mise à jour doit être notifiée
+     * @param {Object} container - Conteneur retourné par listContainers
+     * @returns {Object|null} - Informations sur la mise à jour ou null si rien à notifier
+     */
+    async checkContainer(container) {
+        try {
+            logVerbose(`\nAnalyse du conteneur: ${container.name}`);
+            logVerbose(`Image: ${container.imageWithTag}`);
+
+            // Les images épinglées par digest (image@sha256:...) sont immuables:
+            // aucune mise à jour de tag n'a de sens, on évite tout appel réseau
+            if (container.imageWithTag.includes('@sha256')) {
+                logVerbose('Image épinglée par digest, vérification ignorée.');
+                return null;
+            }
+
+            // Court-circuit via l'état: si une notification récente couvre
+            // déjà cette image:tag, on économise l'appel à Docker Hub
+            if (stateService.canSkipCheck(container.image, container.tag)) {
+                logVerbose('Notification récente déjà envoyée, vérification Docker Hub ignorée.');
+                return null;
+            }
+
+            // Récupération des informations sur le dépôt
+            const imageInfo = await this.fetchRepository(container.image, container.tag);
+
+            if (imageInfo.error) {
+                console.log(`Erreur: ${imageInfo.error}`);
+                return null;
+            }
+
+            // Affichage du tag valable trouvé
+            if (imageInfo.latest_version_tag) {
+                const tag = imageInfo.latest_version_tag;
+                const date = new Date(tag.last_updated).toLocaleString();
+
+                logVerbose(`\nVersion valable trouvée:`);
+                logVerbose(`  - ${tag.name} (mise à jour le ${date})`);
+
+                // Vérification si une mise à jour est disponible
+                if (tag.name !== container.tag) {
+                    // Court-circuit par digest: deux tags différents peuvent pointer
+                    // vers le même contenu (ex: "latest" et "1.2.3"); dans ce cas
+                    // le conteneur est déjà à jour et la comparaison s'arrête là
+                    if (tag.digest && tag.digest !== 'N/A') {
+                        const localDigest = await this.getLocalImageDigest(container.imageWithTag);
+                        if (localDigest && localDigest.startsWith(tag.digest)) {
+                            logVerbose('\n✅ L\'image locale correspond déjà au digest de la version recommandée.');
+                            return null;
                         }
                     }
-                    
-                    return stateFilter && selfFilter;
-                })
-                .map(container => {
-                    // Séparation de l'image et du tag
-                    const [imageName, imageTag] = container.Image.includes(':') 
-                        ? container.Image.split(':') 
-                        : [container.Image, 'latest'];
-                    
-                    // Extraction du nom du conteneur (sans le slash initial)
-                    const containerNames = container.Names.map(name => name.replace('/', ''));
-                    
+
+                    console.log('\n❗ Une mise à jour est disponible!');
+                    console.log(`  Version actuelle: ${container.tag}`);
+                    console.log(`  Version recommandée: ${tag.name}`);
+
+                    // La décision de notifier est prise en lot dans
+                    // checkForUpdates, sur un seul instantané de l'état
                     return {
-                        id: container.Id.substring(0, 12), // ID court du conteneur
-                        names: containerNames,            // Noms sans le slash
-                        name: containerNames[0] || '',    // Premier nom (principal)
-                        imageWithTag: container.Image,    // Image complète avec tag
-                        image: imageName,                // Nom de l'image sans tag
-                        tag: imageTag,                   // Tag de l'image
-                        state: container.State,          // État du conteneur
-                        status: container.Status         // Statut détaillé du conteneur
+                        containerName: container.name,
+                        image: container.image,
+                        currentTag: container.tag,
+                        latestVersion: tag.name,
+                        lastUpdated: tag.last_updated
                     };
-                });
+                } else {
+                    logVerbose('\n✅ Le conteneur utilise déjà la version recommandée.');
+                }
+            } else {
+                logVerbose('\n⚠️ Aucune version valable trouvée pour cette image.');
+            }
+
+            return null;
         } catch (error) {
-            console.error('Erreur lors de la récupération des conteneurs:', error);
-            throw error;
+            console.error(`Erreur lors de l'analyse du conteneur ${container.name}:`, error);
+            return null;
         }
     }
 
     /**
      * Vérifie les mises à jour disponibles pour tous les conteneurs
+     * Les conteneurs sont analysés en parallèle (avec une limite de concurrence)
+     * car le travail est dominé par la latence réseau vers Docker Hub
      * @returns {Array} Liste des mises à jour disponibles
      */
     async checkForUpdates() {
         console.log('Vérification des mises à jour disponibles...');
-        const updates = [];
-        
+
         try {
             // Récupération des conteneurs en cours d'exécution
             const containers = await this.listContainers(true);
-            console.log(`${containers.length} conteneurs en cours d'exécution`);
-            
-            // Parcours des conteneurs
-            for (const container of containers) {
-                try {
-                    console.log(`\nAnalyse du conteneur: ${container.name}`);
-                    console.log(`Image: ${container.imageWithTag}`);
-                    
-                    // Récupération des informations sur le dépôt
-                    const imageInfo = await this.fetchRepository(container.image, container.tag);
-                    
-                    if (imageInfo.error) {
-                        console.log(`Erreur: ${imageInfo.error}`);
-                        continue;
-                    }
-                    
-                    // Affichage du tag valable trouvé
-                    if (imageInfo.latest_version_tag) {
-                        const tag = imageInfo.latest_version_tag;
-                        const date = new Date(tag.last_updated).toLocaleString();
-                        
-                        console.log(`\nVersion valable trouvée:`);
-                        console.log(`  - ${tag.name} (mise à jour le ${date})`);
-                        
-                        // Vérification si une mise à jour est disponible
-                        if (tag.name !== container.tag) {
-                            console.log('\n❗ Une mise à jour est disponible!');
-                            console.log(`  Version actuelle: ${container.tag}`);
-                            console.log(`  Version recommandée: ${tag.name}`);
-                            
-                            // Vérification si une notification doit être envoyée
-                            if (stateService.shouldNotify(container.image, container.tag, tag.name)) {
-                                // Ajout de la mise à jour à la liste
-                                updates.push({
-                                    containerName: container.name,
-                                    image: container.image,
-                                    currentTag: container.tag,
-                                    latestVersion: tag.name,
-                                    lastUpdated: tag.last_updated
-                                });
-                            }
-                            
-                        } else {
-                            console.log('\n✅ Le conteneur utilise déjà la version recommandée.');
-                        }
-                    } else {
-                        console.log('\n⚠️ Aucune version valable trouvée pour cette image.');
-                    }
-                } catch (error) {
-                    console.error(`Erreur lors de l'analyse du conteneur ${container.name}:`, error);
-                }
-            }
-            
+            const byImage = this.groupContainersByImage(containers);
+            console.log(`${containers.length} conteneurs en cours d'exécution (${byImage.size} image(s) distincte(s))`);
+
+            // Analyse des conteneurs en parallèle
+            const results = await this.runWithConcurrency(
+                containers,
+                MAX_CONCURRENT_CHECKS,
+                container => this.checkContainer(container)
+            );
+
+            // Mises à jour candidates, puis décision de notification prise
+            // en lot sur un seul instantané de l'état
+            const candidates = results.filter(update => update !== null);
+            const updates = stateService.filterNotifiable(candidates);
+
             // Nettoyage des images qui ne sont plus en cours d'exécution
-            const runningImageNames = containers.map(container => container.image);
-            stateService.cleanupImages(runningImageNames);
+            // (les clés du regroupement donnent directement la liste dédupliquée)
+            stateService.cleanupImages([...byImage.keys()]);
+
+            // Persistance du cache Docker Hub pour les prochains redémarrages
+            this.saveTagsCache();
             
             console.log(`\nAnalyse des conteneurs terminée. ${updates.length} mise(s) à jour disponible(s).`);
             return updates;
@@ -230,100 +675,138 @@ class DockerService {
     }
 
     /**
-     * Fonction de test pour afficher les conteneurs en cours d'exécution
-     * et la première version valable disponible
+     * Récupère les informations de plusieurs dépôts en parallèle
+     * Le nombre de requêtes simultanées est borné par MAX_CONCURRENT_CHECKS
+     * et chaque appel reste soumis au limiteur de débit
+     * @param {Array<{image: string, tag: string}>} items - Couples image/tag à interroger
+     * @returns {Array} - Résultats de fetchRepository, dans l'ordre d'entrée
      */
-    async test() {
-        try {
-            // Récupération des conteneurs en cours d'exécution
-            const containers = await this.listContainers();
-            console.log('Conteneurs en cours d\'exécution trouvés:', containers.length);
-            
+    async fetchRepositories(items) {
+        return this.runWithConcurrency(
+            items,
+            MAX_CONCURRENT_CHECKS,
+            ({ image, tag }) => this.fetchRepository(image, tag)
+        );
+    }
+
+    /**
+     * Effectue une requête GET vers l'API Docker Hub avec limitation de débit
+     * et nouvelles tentatives en cas de throttling (HTTP 429 ou 503)
+     * Respecte l'en-tête Retry-After si présent, sinon applique un backoff
+     * exponentiel avec un peu d'aléa pour éviter les reprises synchronisées
+     * @param {string} url - URL à requêter
+     * @returns {Promise<Object>} - Réponse axios
+     */
+    async fetchTagsPage(url) {
+        // Consultation du cache avant tout appel réseau
+        const cached = this.tagsCache.get(url);
+        if (cached && Date.now() - cached.timestamp < HUB_CACHE_TTL_MS) {
+            // Ré-insertion en fin de Map pour marquer l'entrée comme récemment utilisée
+            this.tagsCache.delete(url);
+            this.tagsCache.set(url, cached);
+            return { data: cached.data };
+        }
+
+        // Regroupement des requêtes identiques en vol: lorsque plusieurs
+        // conteneurs partagent la même image, les vérifications concurrentes
+        // attendent la même promesse au lieu de déclencher chacune leur appel
+        const pending = this.inFlightRequests.get(url);
+        if (pending) {
+            return pending;
+        }
+
+        const request = this.requestTagsPage(url, cached)
+            .finally(() => this.inFlightRequests.delete(url));
+        this.inFlightRequests.set(url, request);
+        return request;
+    }
+
+    /**
+     * Effectue réellement la requête réseau vers l'endpoint /tags
+     * (utilisé par fetchTagsPage une fois le cache et les requêtes en vol consultés)
+     * @param {string} url - URL à requêter
+     * @param {Object|undefined} cached - Entrée de cache expirée, pour la revalidation conditionnelle
+     * @returns {Promise<Object>} - Réponse axios
+     */
+    async requestTagsPage(url, cached) {
+        // Requête conditionnelle: si on connaît l'ETag (ou à défaut la date de
+        // dernière modification) d'une entrée expirée, le serveur peut répondre
+        // 304 et nous éviter le corps complet
+        const headers = {};
+        if (cached && cached.etag) {
+            headers['If-None-Match'] = cached.etag;
+        } else if (cached && cached.lastModified) {
+            headers['If-Modified-Since'] = cached.lastModified;
+        }
 
-            if (containers.length === 0) {
-                console.log('Aucun conteneur en cours d\'exécution.');
-                return;
+        for (let attempt = 0; attempt <= HUB_MAX_RETRIES; attempt++) {
+            // Respect de la limite de débit avant chaque tentative
+            await this.rateLimiter.take();
+
+            // validateStatus accepte tout: le code de statut est examiné une seule
+            // fois ci-dessous au lieu de passer par une exception axios interceptée
+            // par un catch générique (seules les erreurs réseau lèvent encore)
+            const response = await hubClient.get(url, {
+                headers,
+                validateStatus: () => true
+            });
+            const status = response.status;
+
+            // 304 Not Modified: le contenu en cache est toujours valable
+            if (status === 304) {
+                cached.timestamp = Date.now();
+                this.tagsCache.delete(url);
+                this.tagsCache.set(url, cached);
+                return { data: cached.data };
             }
-            
-            console.log('\nListe des conteneurs en cours d\'exécution:');
-            
-            // Traitement de chaque conteneur séquentiellement
-            for (let i = 0; i < containers.length; i++) {
-                const container = containers[i];
-                try {
-                    console.log(`\n=== Conteneur ${i + 1}/${containers.length} ===`);
-                    console.log(`Nom: ${container.names.join(', ')}`);
-                    console.log(`Image complète: ${container.imageWithTag}`);
-                    console.log(`Nom de l'image: ${container.image}`);
-                    console.log(`Tag actuel: ${container.tag}`);
-                    
-                    // Récupération du premier tag numéroté valable
-                    // On passe le nom de l'image et le tag actuel
-                    console.log('Recherche de la première version valable compatible...');
-                    const imageInfo = await this.fetchRepository(container.image, container.tag);
-                    
-                    if (imageInfo.error) {
-                        console.log(`Erreur: ${imageInfo.error}`);
-                        continue;
-                    }
-                    
-                    // Affichage du tag valable trouvé
-                    if (imageInfo.latest_version_tag) {
-                        const tag = imageInfo.latest_version_tag;
-                        const date = new Date(tag.last_updated).toLocaleString();
-                        console.log(`\nVersion valable trouvée:`);
-                        console.log(`  - ${tag.name} (mise à jour le ${date})`);
-                        
-                        
-                        // Vérification si une mise à jour est disponible
-                        if (tag.name !== container.tag) {
-                            console.log('\n❗ Une mise à jour est disponible!');
-                            console.log(`  Version actuelle: ${container.tag}`);
-                            console.log(`  Version recommandée: ${tag.name}`);
-                            
-                            // Pour la méthode test(), on notifie directement
-                            // Note: Cette méthode est maintenue pour compatibilité, mais checkForUpdates() est préférée
-                            if (stateService.shouldNotify(container.image, container.tag, tag.name)) {
-                                // Préparation du message de notification
-                                const message = `## 🔴 Mise à jour Docker disponible\n\n` +
-                                               `### ${container.name}\n` +
-                                               `- **Image**: ${container.imageWithTag}\n` +
-                                               `- **Version actuelle**: ${container.tag}\n` +
-                                               `- **Nouvelle version**: ${tag.name}\n` +
-                                               `- **Date de publication**: ${new Date(tag.last_updated).toLocaleDateString('fr-FR')}\n\n` +
-                                               `---\n*Docker Version Fetcher - Notification automatique*`;
-                                
-                                // Envoi de la notification
-                                const title = `Mise à jour disponible pour ${container.name}`;
-                                await notificationService.sendNotification(message, title);
-                                
-                                // Mise à jour de l'état après notification
-                                stateService.updateImageState(container.image, {
-                                    containerName: container.name,
-                                    image: container.image,
-                                    currentTag: container.tag,
-                                    latestVersion: tag.name,
-                                    lastUpdated: tag.last_updated
-                                });
-                            }
-                        } else {
-                            console.log('\n✅ Le conteneur utilise déjà la version recommandée.');
-                        }
-                    } else {
-                        console.log('\nAucune version numérotée valable trouvée pour cette image.');
-                    }
-                } catch (containerError) {
-                    console.error(`Erreur lors du traitement du conteneur:`, containerError);
+
+            // Chemin rapide: réponse valide
+            if (status >= 200 && status < 300) {
+                // Prise en compte du budget annoncé par l'API, si exposé
+                this.rateLimiter.syncRemaining(Number(response.headers['x-ratelimit-remaining']));
+
+                // Mise en cache de la réponse (avec son ETag pour les requêtes
+                // conditionnelles futures), et éviction de l'entrée la plus ancienne si besoin
+                this.tagsCache.set(url, {
+                    timestamp: Date.now(),
+                    data: response.data,
+                    etag: response.headers.etag || null,
+                    lastModified: response.headers['last-modified'] || null
+                });
+                if (this.tagsCache.size > HUB_CACHE_MAX_SIZE) {
+                    this.tagsCache.delete(this.tagsCache.keys().next().value);
                 }
+
+                return response;
             }
-            
-            // Nettoyage des images qui ne sont plus en cours d'exécution
-            const runningImageNames = containers.map(container => container.image);
-            stateService.cleanupImages(runningImageNames);
-            
-            console.log('\nAnalyse des conteneurs terminée.');
-        } catch (error) {
-            console.error('Erreur dans la fonction test:', error);
+
+            // Throttling (429/503): nouvelle tentative après attente
+            if ((status === 429 || status === 503) && attempt < HUB_MAX_RETRIES) {
+                // L'en-tête Retry-After peut être en secondes ou une date HTTP
+                let delayMs = null;
+                const retryAfter = response.headers['retry-after'];
+                if (retryAfter) {
+                    const seconds = Number(retryAfter);
+                    delayMs = Number.isNaN(seconds)
+                        ? new Date(retryAfter).getTime() - Date.now()
+                        : seconds * 1000;
+                }
+
+                // Repli sur un backoff exponentiel avec jitter
+                if (delayMs === null || Number.isNaN(delayMs) || delayMs < 0) {
+                    delayMs = 1000 * 2 ** attempt + Math.random() * 500;
+                }
+
+                console.log(`API Docker Hub limitée (HTTP ${status}), nouvelle tentative dans ${Math.round(delayMs)}ms (${attempt + 1}/${HUB_MAX_RETRIES})`);
+                await new Promise(resolve => setTimeout(resolve, delayMs));
+                continue;
+            }
+
+            // Statut non réessayable (ou tentatives épuisées): propagation d'une
+            // erreur portant la réponse, comme le ferait axios
+            const httpError = new Error(`HTTP ${status} lors de la requête vers ${url}`);
+            httpError.response = response;
+            throw httpError;
         }
     }
 
@@ -334,83 +817,120 @@ class DockerService {
      * @param {number} maxPages - Nombre maximum de pages à parcourir
      * @returns {Object} - Information sur le premier tag numéroté valable
      */
-    async fetchRepository(image, currentTag = 'latest', maxPages = 5) {
+    async fetchRepository(image, currentTag = 'latest', maxPages = TAGS_MAX_PAGES) {
         try {
-            // Traitement spécial pour les images officielles (sans namespace)
-            if (!image.includes('/')) {
-                image = `library/${image}`;
+            // Traitement spécial pour les images officielles (sans namespace),
+            // normalisé une seule fois par image grâce au cache
+            image = normalizeRepoPath(image);
+
+            // Cache négatif: si le dépôt était introuvable récemment, on évite
+            // de re-frapper l'API pour chaque conteneur utilisant cette image
+            const missingSince = this.missingRepoCache.get(image);
+            if (missingSince && Date.now() - missingSince < HUB_NEGATIVE_CACHE_TTL_MS) {
+                return {
+                    name: image,
+                    error: `Dépôt introuvable: ${image}`,
+                    latest_version_tag: null
+                };
             }
             
             // Déterminer si le tag actuel est purement numérique ou contient des lettres
-            const isCurrentTagNumeric = !/[a-zA-Z]/.test(currentTag);
-            console.log(`Tag actuel (${currentTag}) est ${isCurrentTagNumeric ? 'purement numérique' : 'avec des lettres'}`);
+            const isCurrentTagNumeric = !HAS_LETTERS_RE.test(currentTag);
+            logVerbose(`Tag actuel (${currentTag}) est ${isCurrentTagNumeric ? 'purement numérique' : 'avec des lettres'}`);
+
+            // Variante du tag actuel (ex: "alpine" pour "1.25-alpine"), extraite
+            // une seule fois ici plutôt qu'à chaque tag candidat
+            const currentVariant = extractVariant(currentTag);
             
-            // Taille de page fixée à 10 pour éviter de surcharger l'API
-            const pageSize = 10;
+            // Taille de page configurable (TAGS_PAGE_SIZE), bornée pour éviter de surcharger l'API
+            const pageSize = TAGS_PAGE_SIZE;
             let totalTagsCount = 0;
             let nextUrl = null;
             
-            // Fonction pour vérifier si un tag est numéroté et utilisable
-            const isVersionTag = (tagName) => {
-                // Patterns pour identifier les tags numérotés
-                // Exemples: 1.0, v1.0, 1.0.0, v1.0.0, 1.0.0-alpha, 1, v1, etc.
-                const versionPatterns = [
-                    /^v?\d+(\.\d+)*(-[a-zA-Z0-9._-]+)?$/, // Format standard: 1.0.0, v1.0.0, 1.0.0-alpha
-                    /^\d{4}\.\d{2}(\.\d+)?$/, // Format date: 2023.01, 2023.01.1
-                    /^\d{8}$/ // Format date compact: 20230101
-                ];
-                
-                // Vérifie si le tag correspond à l'un des patterns
-                return versionPatterns.some(pattern => pattern.test(tagName));
-            };
-            
-            
             // Fonction pour vérifier si un tag correspond au même type que le tag actuel
             const matchesCurrentTagType = (tagName) => {
                 // Si le tag actuel est purement numérique, on ne veut que des tags purement numériques
                 if (isCurrentTagNumeric) {
-                    return !/[a-zA-Z]/.test(tagName);
+                    return !HAS_LETTERS_RE.test(tagName);
                 }
-                // Sinon, on accepte tous les tags
-                return true;
+
+                // Les tags doivent porter la même variante que le tag actuel:
+                // recommander "1.26" pour un conteneur en "1.25-alpine" (ou
+                // "1.26-alpine" pour un conteneur en "1.25") serait un faux positif
+                return extractVariant(tagName) === currentVariant;
             };
             
+            // URL de première page, construite une seule fois par dépôt
+            const firstPageUrl = tagsUrlFor(image, pageSize);
+
             // Parcourir les pages jusqu'à trouver un tag valable ou atteindre maxPages
             for (let page = 1; page <= maxPages; page++) {
-                // Construire l'URL pour la page courante
-                const url = nextUrl || `https://registry.hub.docker.com/v2/repositories/${image}/tags?page_size=${pageSize}&ordering=last_updated`;
-                console.log(`Récupération des tags (page ${page}/${maxPages}) depuis: ${url}`);
-                
-                // Récupérer les tags de la page
-                const response = await axios.get(url);
+                // L'API fournit directement l'URL des pages suivantes
+                const url = nextUrl || firstPageUrl;
+                logVerbose(`Récupération des tags (page ${page}/${maxPages}) depuis: ${url}`);
+
+                // Récupérer les tags de la page (avec limitation de débit et reprise sur 429/503)
+                const response = await this.fetchTagsPage(url);
                 totalTagsCount = response.data.count;
                 
-                // Chercher le premier tag numéroté valable dans cette page
-                for (const tag of response.data.results) {
-                    // Vérifier si le tag est numéroté et correspond au même type que le tag actuel
-                    if (isVersionTag(tag.name) && matchesCurrentTagType(tag.name)) {
-                        console.log(`Tag valable trouvé: ${tag.name} (compatible avec le type du tag actuel)`);
-                        
-                        // Retourner directement le premier tag valable
-                        return {
-                            name: image,
-                            latest_version_tag: {
-                                name: tag.name,
-                                last_updated: tag.last_updated,
-                                full_size: tag.full_size,
-                                digest: tag.digest?.substring(0, 16) || 'N/A'
-                            },
-                            total_tags_count: totalTagsCount
-                        };
-                    } else if (isVersionTag(tag.name)) {
-                        console.log(`Tag valable ignoré: ${tag.name} (type incompatible avec le tag actuel)`);
+                // Retenir le tag valable de version la plus élevée de la page,
+                // en un seul parcours linéaire: l'ordre last_updated du Hub peut
+                // placer une ancienne version re-publiée avant la plus récente,
+                // donc prendre le premier tag rencontré n'est pas fiable
+                let tag = null;
+                let tagVersion = null;
+
+                for (const candidate of response.data.results) {
+                    // Chaque critère (format de version, type compatible, image
+                    // Linux) n'est évalué qu'une seule fois par tag
+                    if (!isVersionTag(candidate.name)
+                        || !matchesCurrentTagType(candidate.name)
+                        || !hasLinuxImage(candidate)) {
+                        continue;
+                    }
+
+                    const version = coerceVersion(candidate.name);
+                    if (!version) {
+                        // Tag valable mais non interprétable: conservé seulement
+                        // à défaut d'un meilleur candidat
+                        if (!tag) {
+                            tag = candidate;
+                        }
+                        continue;
+                    }
+
+                    if (!tagVersion || semver.gt(version, tagVersion)) {
+                        tag = candidate;
+                        tagVersion = version;
                     }
                 }
+
+                if (tag) {
+                    logVerbose(`Tag valable trouvé: ${tag.name} (compatible avec le type du tag actuel)`);
+
+                    // Certains dépôts n'exposent pas de digest au niveau du tag:
+                    // on se rabat alors sur celui de l'image linux/amd64, trouvé
+                    // en un seul parcours de la liste des plateformes
+                    const tagDigest = tag.digest
+                        || tag.images?.find(img => img.os === 'linux' && img.architecture === 'amd64')?.digest;
+
+                    // Retourner directement le premier tag valable
+                    return {
+                        name: image,
+                        latest_version_tag: {
+                            name: tag.name,
+                            last_updated: tag.last_updated,
+                            full_size: tag.full_size,
+                            digest: tagDigest?.substring(0, 16) || 'N/A'
+                        },
+                        total_tags_count: totalTagsCount
+                    };
+                }
                 
                 // Aucun tag valable dans cette page, vérifier s'il y a une page suivante
                 nextUrl = response.data.next;
                 if (!nextUrl) {
-                    console.log('Fin des pages disponibles.');
+                    logVerbose('Fin des pages disponibles.');
                     break;
                 }
             }
@@ -423,6 +943,18 @@ class DockerService {
                 total_tags_count: totalTagsCount
             };
         } catch (error) {
+            // Un 404 sur l'endpoint /tags signifie que le dépôt n'existe pas:
+            // inutile de faire une requête de vérification séparée en amont
+            if (error.response && error.response.status === 404) {
+                console.log(`Dépôt introuvable sur Docker Hub: ${image}`);
+                this.missingRepoCache.set(image, Date.now());
+                return {
+                    name: image,
+                    error: `Dépôt introuvable: ${image}`,
+                    latest_version_tag: null
+                };
+            }
+
             console.error(`Erreur lors de la récupération des tags pour ${image}:`, error.message);
             return {
                 name: image,
@@ -432,25 +964,54 @@ class DockerService {
         }
     }
 
-    // Fonction pour trier les tags par version sémantique
+    /**
+     * Trouve le tag de version la plus élevée en un seul parcours
+     * À préférer à sortVersionTags()[0]: un tri complet coûte O(n log n)
+     * alors que seul le maximum est nécessaire
+     * @param {Array} tags - Tags à comparer (objets avec une propriété name)
+     * @returns {Object|null} - Tag de version maximale, ou null si la liste est vide
+     */
+    findLatestVersionTag(tags) {
+        let latest = null;
+        let latestVersion = null;
+
+        for (const tag of tags) {
+            const version = coerceVersion(tag.name);
+            if (!version) {
+                continue;
+            }
+
+            if (!latest || semver.gt(version, latestVersion)) {
+                latest = tag;
+                latestVersion = version;
+            }
+        }
+
+        return latest;
+    }
+
+    // Fonction pour trier les tags par version sémantique (ordre décroissant)
     sortVersionTags(tags) {
         return tags.sort((a, b) => {
-            const versionA = a.name.replace(/^v/, '');
-            const versionB = b.name.replace(/^v/, '');
-            
-            const versionPartsA = versionA.split('.').map(Number);
-            const versionPartsB = versionB.split('.').map(Number);
-            
-            for (let i = 0; i < Math.max(versionPartsA.length, versionPartsB.length); i++) {
-                const partA = versionPartsA[i] || 0;
-                const partB = versionPartsB[i] || 0;
-                
-                if (partA !== partB) {
-                    return partB - partA;
+            // coerceVersion normalise les tags (préfixe "v", parties manquantes, etc.)
+            // et mémoïse le résultat: chaque nom n'est analysé qu'une seule fois
+            // même si le tri compare chaque tag O(log n) fois
+            const versionA = coerceVersion(a.name);
+            const versionB = coerceVersion(b.name);
+
+            // Les tags que semver ne sait pas interpréter sont relégués en fin
+            // de liste (ordre alphabétique entre eux, pour rester déterministe)
+            if (!versionA || !versionB) {
+                if (versionA) {
+                    return -1;
+                }
+                if (versionB) {
+                    return 1;
                 }
+                return a.name.localeCompare(b.name);
             }
-            
-            return 0;
+
+            return semver.rcompare(versionA, versionB);
         });
     }
 }
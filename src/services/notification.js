@@ -1,17 +1,76 @@
 import axios from 'axios';
 import fs from 'fs';
 import path from 'path';
+import http from 'http';
+import https from 'https';
+
+// Client HTTP partagé avec connexions persistantes (keep-alive): les
+// notifications successives réutilisent la même connexion TCP/TLS vers
+// Gotify au lieu de payer une poignée de main complète à chaque envoi
+const gotifyClient = axios.create({
+  httpAgent: new http.Agent({ keepAlive: true, maxSockets: 2 }),
+  httpsAgent: new https.Agent({ keepAlive: true, maxSockets: 2 }),
+  timeout: 10000
+});
+
+// Configuration Gotify lue et analysée une seule fois au chargement du
+// module (la priorité est convertie en entier ici plutôt qu'à chaque envoi)
+const GOTIFY_URL = process.env.GOTIFY_URL;
+const GOTIFY_TOKEN = process.env.GOTIFY_TOKEN;
+const GOTIFY_PRIORITY = parseInt(process.env.GOTIFY_PRIORITY, 10) || 5;
+const GOTIFY_TITLE = process.env.GOTIFY_TITLE;
+const SERVER_NAME = process.env.SERVER_NAME || 'Serveur Principal';
+
+// Mode d'envoi: 'combined' (une notification regroupée, défaut) ou
+// 'split' (une notification par mise à jour, envoyées en parallèle)
+const NOTIFICATION_MODE = process.env.NOTIFICATION_MODE || 'combined';
+
+// Nombre maximum de tentatives d'envoi vers Gotify (pannes transitoires)
+const GOTIFY_MAX_RETRIES = parseInt(process.env.GOTIFY_MAX_RETRIES || '3', 10);
+
+// Journalisation détaillée (même convention que docker_version.js):
+// VERBOSE_LOGS=false coupe les aperçus de message
+const VERBOSE_LOGS = process.env.VERBOSE_LOGS !== 'false';
+
+// Options de formatage de date partagées par tous les messages
+// (l'objet est alloué une seule fois au lieu d'une fois par date formatée)
+const FR_DATE_OPTIONS = { day: '2-digit', month: '2-digit', year: 'numeric' };
+
+/**
+ * Formate une date au format français (jj/mm/aaaa)
+ * @param {Date} date - Date à formater
+ * @returns {string} - Date formatée
+ */
+function formatDateFr(date) {
+  return date.toLocaleDateString('fr-FR', FR_DATE_OPTIONS);
+}
+
+// Pied de page commun à tous les messages
+const MESSAGE_FOOTER = `---\n🚀 *Docker Version Fetcher - Notification automatique*`;
 
 class NotificationService {
   constructor() {
-    this.gotifyUrl = process.env.GOTIFY_URL;
-    this.gotifyToken = process.env.GOTIFY_TOKEN;
-    this.gotifyPriority = process.env.GOTIFY_PRIORITY;
-    this.gotifyTitle = process.env.GOTIFY_TITLE;
-    this.serverName = process.env.SERVER_NAME || 'Serveur Principal';
-    
+    this.gotifyUrl = GOTIFY_URL;
+    this.gotifyToken = GOTIFY_TOKEN;
+    this.gotifyPriority = GOTIFY_PRIORITY;
+    this.gotifyTitle = GOTIFY_TITLE;
+    this.serverName = SERVER_NAME;
+
+    // Indicateur calculé une seule fois: sans URL et token, aucun envoi
+    // vers Gotify n'est possible
+    this.configured = Boolean(this.gotifyUrl && this.gotifyToken);
+    if (!this.configured) {
+      console.warn('Gotify non configuré (GOTIFY_URL/GOTIFY_TOKEN manquants), les notifications seront ignorées.');
+    }
+
     // Chargement des icônes personnalisées depuis le fichier de configuration
     this.containerIcons = this.loadIcons();
+
+    // Paires [clé en minuscules, icône] précalculées une seule fois:
+    // la recherche d'icône n'a plus qu'à abaisser la casse du nom d'image
+    this.iconEntries = Object.entries(this.containerIcons)
+      .filter(([key]) => key !== 'default')
+      .map(([key, icon]) => [key.toLowerCase(), icon]);
   }
   
   /**
@@ -53,17 +112,35 @@ class NotificationService {
    * @returns {string} - Icône à utiliser
    */
   getContainerIcon(imageName) {
-    // Recherche d'une correspondance dans le mapping des icônes
-    for (const [key, icon] of Object.entries(this.containerIcons)) {
-      if (key !== 'default' && imageName.toLowerCase().includes(key.toLowerCase())) {
+    const lowerName = imageName.toLowerCase();
+
+    // Recherche d'une correspondance dans les entrées précalculées
+    for (const [key, icon] of this.iconEntries) {
+      if (lowerName.includes(key)) {
         return icon;
       }
     }
-    
+
     // Icône par défaut si aucune correspondance n'est trouvée
     return this.containerIcons.default;
   }
   
+  /**
+   * Ajoute au message en construction le bloc décrivant une mise à jour
+   * @param {Array} parts - Segments du message en cours d'assemblage
+   * @param {Object} update - Informations sur la mise à jour
+   * @param {string} heading - Titre du bloc (icône + nom du conteneur)
+   */
+  appendUpdateParts(parts, update, heading) {
+    const updateDate = formatDateFr(new Date(update.lastUpdated));
+
+    parts.push(`### ${heading}\n`);
+    parts.push(`🏷️ **Image**: \`${update.image}\`\n`);
+    parts.push(`🔻 **Version actuelle**: \`${update.currentTag}\`\n`);
+    parts.push(`🔺 **Nouvelle version**: \`${update.latestVersion}\`\n`);
+    parts.push(`📆 **Date de publication**: ${updateDate}\n\n`);
+  }
+
   /**
    * Crée un message formaté pour une mise à jour unique
    * @param {Object} update - Informations sur la mise à jour
@@ -71,30 +148,19 @@ class NotificationService {
    */
   createSingleUpdateMessage(update) {
     const now = new Date();
-    const formattedDate = now.toLocaleDateString('fr-FR', { 
-      day: '2-digit', 
-      month: '2-digit', 
-      year: 'numeric' 
-    });
-    
-    const updateDate = new Date(update.lastUpdated).toLocaleDateString('fr-FR', {
-      day: '2-digit',
-      month: '2-digit',
-      year: 'numeric'
-    });
-    
     const containerIcon = this.getContainerIcon(update.image);
-    
-    let message = `## 📢 Mise à jour Docker disponible\n\n`;
-    message += `📅 *Détecté le ${formattedDate} à ${now.toLocaleTimeString('fr-FR')}*\n\n`;
-    message += `### ${containerIcon} ${update.containerName}\n`;
-    message += `🏷️ **Image**: \`${update.image}\`\n`;
-    message += `🔻 **Version actuelle**: \`${update.currentTag}\`\n`;
-    message += `🔺 **Nouvelle version**: \`${update.latestVersion}\`\n`;
-    message += `📆 **Date de publication**: ${updateDate}\n\n`;
-    message += `---\n🚀 *Docker Version Fetcher - Notification automatique*`;
-    
-    return message;
+
+    // Assemblage en une seule allocation finale plutôt que par
+    // concaténations successives
+    const parts = [
+      `## 📢 Mise à jour Docker disponible\n\n`,
+      `📅 *Détecté le ${formatDateFr(now)} à ${now.toLocaleTimeString('fr-FR')}*\n\n`
+    ];
+
+    this.appendUpdateParts(parts, update, `${containerIcon} ${update.containerName}`);
+    parts.push(MESSAGE_FOOTER);
+
+    return parts.join('');
   }
   
   /**
@@ -106,37 +172,24 @@ class NotificationService {
     if (updates.length === 0) return '';
     
     const now = new Date();
-    const formattedDate = now.toLocaleDateString('fr-FR', { 
-      day: '2-digit', 
-      month: '2-digit', 
-      year: 'numeric' 
-    });
-    
-    // Construction du message avec une belle présentation et des icônes
-    let message = `## 📢 Mises à jour Docker disponibles\n\n`;
-    message += `📅 *Détecté le ${formattedDate} à ${now.toLocaleTimeString('fr-FR')}*\n\n`;
-    
+
+    // Construction du message avec une belle présentation et des icônes,
+    // assemblé en une seule allocation finale plutôt que par concaténations
+    const parts = [
+      `## 📢 Mises à jour Docker disponibles\n\n`,
+      `📅 *Détecté le ${formatDateFr(now)} à ${now.toLocaleTimeString('fr-FR')}*\n\n`
+    ];
+
     // Ajout de chaque mise à jour au message avec des icônes
     updates.forEach((update, index) => {
-      const updateDate = new Date(update.lastUpdated).toLocaleDateString('fr-FR', {
-        day: '2-digit',
-        month: '2-digit',
-        year: 'numeric'
-      });
-      
       const containerIcon = this.getContainerIcon(update.image);
-      
-      message += `### ${containerIcon} ${index + 1}. ${update.containerName} \n`;
-      message += `🏷️ **Image**: \`${update.image}\`\n`;
-      message += `🔻 **Version actuelle**: \`${update.currentTag}\`\n`;
-      message += `🔺 **Nouvelle version**: \`${update.latestVersion}\`\n`;
-      message += `📆 **Date de publication**: ${updateDate}\n\n`;
+      this.appendUpdateParts(parts, update, `${containerIcon} ${index + 1}. ${update.containerName} `);
     });
-    
+
     // Ajout d'un pied de page avec icône
-    message += `---\n🚀 *Docker Version Fetcher - Notification automatique*`;
-    
-    return message;
+    parts.push(MESSAGE_FOOTER);
+
+    return parts.join('');
   }
   
   /**
@@ -144,6 +197,9 @@ class NotificationService {
    * @param {Object} update - Informations sur la mise à jour
    */
   async notifySingleUpdate(update) {
+    // Sans configuration Gotify, inutile de construire le message
+    if (!this.configured) return;
+
     const message = this.createSingleUpdateMessage(update);
     const title = `[${this.serverName}] Mise à jour disponible pour ${update.containerName}`;
     await this.sendNotification(message, title);
@@ -155,7 +211,19 @@ class NotificationService {
    */
   async notifyMultipleUpdates(updates) {
     if (updates.length === 0) return;
-    
+
+    // Sans configuration Gotify, inutile de construire le message
+    if (!this.configured) return;
+
+    // En mode 'split', chaque mise à jour part dans sa propre notification;
+    // les envois étant limités par la latence réseau, ils sont lancés en
+    // parallèle (coût ~max(RTT) au lieu de la somme des RTT)
+    if (NOTIFICATION_MODE === 'split') {
+      console.log(`Envoi de ${updates.length} notification(s) individuelle(s)`);
+      await Promise.all(updates.map(update => this.notifySingleUpdate(update)));
+      return;
+    }
+
     const message = this.createMultiUpdateMessage(updates);
     const title = updates.length === 1 
       ? `[${this.serverName}] Mise à jour disponible pour ${updates[0].containerName}` 
@@ -172,25 +240,46 @@ class NotificationService {
    * @returns {Promise<Object>} - Réponse de l'API Gotify
    */
   async sendNotification(message, customTitle = null) {
-    console.log("Message envoyé: ", message.substring(0, 100) + '...');
-    try {
-      const url = `${this.gotifyUrl}/message?token=${this.gotifyToken}`;
-      console.log('URL de l\'API Gotify:', url);
-      
-      const response = await axios.post(url, {
-        title: customTitle || this.gotifyTitle,
-        message: message,
-        priority: parseInt(this.gotifyPriority) || 5,
-      });
-      console.log('Notification envoyée avec succès:', response.data);
-    } catch (error) {
-      console.error('Erreur lors de l\'envoi de la notification:', error);
-      console.error('URL utilisée:', `${this.gotifyUrl}/message?token=***`);
-      console.error('Données envoyées:', {
-        title: customTitle || this.gotifyTitle,
-        priority: parseInt(this.gotifyPriority) || 5
-      });
+    if (!this.configured) {
+      return;
+    }
+
+    // Garde explicite: l'extrait n'est même pas construit en mode silencieux
+    if (VERBOSE_LOGS) {
+      console.log("Message envoyé: ", message.substring(0, 100) + '...');
+    }
+
+    const url = `${this.gotifyUrl}/message?token=${this.gotifyToken}`;
+    const payload = {
+      title: customTitle || this.gotifyTitle,
+      message: message,
+      priority: this.gotifyPriority,
+    };
+
+    // Nouvelles tentatives avec attente exponentielle: une panne Gotify
+    // transitoire ne doit pas faire perdre la notification (et le coût de
+    // construction du message est déjà payé)
+    for (let attempt = 0; attempt < GOTIFY_MAX_RETRIES; attempt++) {
+      try {
+        const response = await gotifyClient.post(url, payload);
+        console.log('Notification envoyée avec succès:', response.data);
+        return response.data;
+      } catch (error) {
+        if (attempt < GOTIFY_MAX_RETRIES - 1) {
+          const delay = 1000 * 2 ** attempt + Math.random() * 500;
+          console.warn(`Échec de l'envoi de la notification (tentative ${attempt + 1}/${GOTIFY_MAX_RETRIES}), nouvel essai dans ${Math.round(delay)}ms`);
+          await new Promise(resolve => setTimeout(resolve, delay));
+        } else {
+          // Une seule écriture sur stderr avec tout le contexte utile
+          console.error(
+            `Erreur lors de l'envoi de la notification vers ${this.gotifyUrl}/message?token=*** ` +
+            `(titre: "${payload.title}", priorité: ${payload.priority}):`,
+            error.message
+          );
+        }
+      }
     }
+    return null;
   }
 }
 
@@ -5,6 +5,43 @@
 import fs from 'fs';
 import path from 'path';
 
+// Journalisation détaillée (même convention que docker_version.js):
+// VERBOSE_LOGS=false coupe les traces par image
+const VERBOSE_LOGS = process.env.VERBOSE_LOGS !== 'false';
+
+/**
+ * Journalise uniquement lorsque la journalisation détaillée est activée
+ * @param {...*} args - Arguments transmis à console.log
+ */
+function logVerbose(...args) {
+    if (VERBOSE_LOGS) {
+        console.log(...args);
+    }
+}
+
+// Cache des horodatages ISO déjà analysés (chaîne -> millisecondes epoch):
+// les mêmes valeurs reviennent à chaque cycle tant que l'état ne change pas,
+// inutile de les réanalyser. Taille bornée, éviction de la plus ancienne.
+const PARSED_DATE_CACHE_MAX_SIZE = 256;
+const parsedDateCache = new Map();
+
+/**
+ * Convertit un horodatage ISO en millisecondes epoch, avec mémoïsation
+ * @param {string} isoString - Horodatage au format ISO 8601
+ * @returns {number} - Millisecondes epoch correspondantes
+ */
+function parseIsoMs(isoString) {
+    let ms = parsedDateCache.get(isoString);
+    if (ms === undefined) {
+        ms = new Date(isoString).getTime();
+        if (parsedDateCache.size >= PARSED_DATE_CACHE_MAX_SIZE) {
+            parsedDateCache.delete(parsedDateCache.keys().next().value);
+        }
+        parsedDateCache.set(isoString, ms);
+    }
+    return ms;
+}
+
 class StateService {
     constructor() {
         // Chemin du fichier de stockage des données
@@ -13,29 +50,57 @@ class StateService {
         
         // Fréquence de notification en jours (par défaut: 7 jours)
         this.notificationFrequency = parseInt(process.env.NOTIFICATION_FREQUENCY || '7', 10);
+        this.notificationFrequencyMs = this.notificationFrequency * 24 * 60 * 60 * 1000;
+
+        // Dernier contenu sérialisé écrit (ou lu) sur disque, pour éviter
+        // de réécrire un fichier identique à chaque cycle
+        this.lastSerializedState = null;
+
+        // État analysé conservé en mémoire après le premier chargement:
+        // le fichier n'est relu qu'une fois, les écritures le traversent
+        this.state = null;
+
+        // Cache des réponses négatives de shouldNotify: "image|version" ->
+        // échéance (ms epoch) jusqu'à laquelle la réponse reste "false".
+        // Invalidé à chaque mise à jour de l'état.
+        this.notifyCache = new Map();
         
         // Initialisation du service
         this.initStateFile();
     }
     
+    /**
+     * Construit un état vide par défaut
+     * @returns {Object} - État initial
+     */
+    defaultState() {
+        return { images: {}, lastCheck: new Date().toISOString() };
+    }
+
     /**
      * Initialise le fichier d'état s'il n'existe pas
      */
     initStateFile() {
         try {
-            // Création du répertoire de données s'il n'existe pas
-            if (!fs.existsSync(this.dataDir)) {
-                console.log(`Création du répertoire de données: ${this.dataDir}`);
-                fs.mkdirSync(this.dataDir, { recursive: true });
-            }
-            
-            // Création du fichier d'état s'il n'existe pas
-            if (!fs.existsSync(this.stateFile)) {
+            // mkdirSync avec recursive est idempotent: pas besoin de tester
+            // l'existence au préalable (un stat de moins et aucune fenêtre
+            // de course entre le test et la création)
+            fs.mkdirSync(this.dataDir, { recursive: true });
+
+            // Création du fichier d'état uniquement s'il n'existe pas: le
+            // drapeau 'wx' échoue avec EEXIST sans écraser un état présent,
+            // ce qui remplace le couple existsSync + écriture
+            try {
+                fs.writeFileSync(
+                    this.stateFile,
+                    JSON.stringify(this.defaultState(), null, 2),
+                    { encoding: 'utf8', flag: 'wx' }
+                );
                 console.log(`Création du fichier d'état: ${this.stateFile}`);
-                this.saveState({
-                    images: {},
-                    lastCheck: new Date().toISOString()
-                });
+            } catch (error) {
+                if (error.code !== 'EEXIST') {
+                    throw error;
+                }
             }
         } catch (error) {
             console.error('Erreur lors de l\'initialisation du fichier d\'\u00e9tat:', error);
@@ -47,16 +112,28 @@ class StateService {
      * @returns {Object} - État actuel
      */
     loadState() {
+        // L'instantané en mémoire fait foi après le premier chargement:
+        // plus de lecture ni d'analyse JSON du fichier à chaque appel
+        if (this.state !== null) {
+            return this.state;
+        }
+
         try {
-            if (fs.existsSync(this.stateFile)) {
-                const data = fs.readFileSync(this.stateFile, 'utf8');
-                return JSON.parse(data);
-            }
-            return { images: {}, lastCheck: new Date().toISOString() };
+            // Lecture directe en un seul appel: le cas "fichier absent" est
+            // g\u00e9r\u00e9 par l'exception plut\u00f4t que par un existsSync pr\u00e9alable,
+            // ce qui \u00e9conomise un stat par chargement et \u00e9vite la situation
+            // o\u00f9 le fichier dispara\u00eet entre le test et la lecture
+            const data = fs.readFileSync(this.stateFile, 'utf8');
+            this.lastSerializedState = data;
+            this.state = JSON.parse(data);
         } catch (error) {
-            console.error('Erreur lors du chargement de l\'\u00e9tat:', error);
-            return { images: {}, lastCheck: new Date().toISOString() };
+            if (error.code !== 'ENOENT') {
+                console.error('Erreur lors du chargement de l\'\u00e9tat:', error);
+            }
+            this.state = this.defaultState();
         }
+
+        return this.state;
     }
     
     /**
@@ -65,12 +142,74 @@ class StateService {
      */
     saveState(state) {
         try {
-            fs.writeFileSync(this.stateFile, JSON.stringify(state, null, 2), 'utf8');
+            // L'instantané en mémoire est mis à jour dans tous les cas;
+            // le disque n'est touché que si le contenu a changé
+            this.state = state;
+
+            const serialized = JSON.stringify(state, null, 2);
+
+            // Rien n'a chang\u00e9 depuis la derni\u00e8re \u00e9criture: pas d'I/O inutile
+            if (serialized === this.lastSerializedState) {
+                return;
+            }
+
+            // \u00c9criture atomique: fichier temporaire puis renommage, pour ne
+            // jamais laisser un state.json tronqu\u00e9 si le processus est
+            // interrompu en pleine \u00e9criture
+            const tmpFile = `${this.stateFile}.${process.pid}.tmp`;
+            fs.writeFileSync(tmpFile, serialized, 'utf8');
+            fs.renameSync(tmpFile, this.stateFile);
+
+            this.lastSerializedState = serialized;
         } catch (error) {
             console.error('Erreur lors de la sauvegarde de l\'\u00e9tat:', error);
         }
     }
     
+    /**
+     * Détermine si la vérification d'une image peut être ignorée sans
+     * interroger Docker Hub
+     * @param {string} image - Nom de l'image Docker (sans tag)
+     * @param {string} currentTag - Tag actuel de l'image
+     * @returns {boolean} - True si la vérification peut être ignorée
+     */
+    canSkipCheck(image, currentTag) {
+        const state = this.loadState();
+        const imageState = state.images[image];
+
+        // Image inconnue ou tag modifié depuis la dernière notification:
+        // il faut vérifier
+        if (!imageState || imageState.currentTag !== currentTag) {
+            return false;
+        }
+
+        // Une notification récente couvre déjà cette image: une éventuelle
+        // version encore plus récente sera signalée à la fin de la fenêtre
+        // de notification, inutile de dépenser du budget Docker Hub avant
+        return Date.now() < this.nextNotificationMs(imageState);
+    }
+
+    /**
+     * Retourne l'échéance du prochain rappel pour une image, en
+     * millisecondes epoch
+     * @param {Object} imageState - État enregistré de l'image
+     * @returns {number} - Échéance du prochain rappel
+     */
+    nextNotificationMs(imageState) {
+        // Échéance précalculée au moment de l'écriture, stockée en
+        // millisecondes epoch: la comparaison est une soustraction entière,
+        // sans analyse de date. Les entrées plus anciennes (champ ISO ou
+        // absent) retombent sur l'analyse mémoïsée.
+        const next = imageState.nextNotification;
+        if (typeof next === 'number') {
+            return next;
+        }
+        if (next) {
+            return parseIsoMs(next);
+        }
+        return parseIsoMs(imageState.lastNotification) + this.notificationFrequencyMs;
+    }
+
     /**
      * Vérifie si une notification doit être envoyée pour une image
      * @param {string} image - Nom de l'image Docker (sans tag)
@@ -79,35 +218,77 @@ class StateService {
      * @returns {boolean} - True si une notification doit être envoyée
      */
     shouldNotify(image, currentTag, latestVersion) {
-        const state = this.loadState();
-        const now = new Date();
-        
+        // Réponse négative encore valable en cache: ni chargement d'état,
+        // ni analyse de dates (le cas "rien à signaler" domine largement)
+        const cacheKey = `${image}|${latestVersion}`;
+        const cachedUntil = this.notifyCache.get(cacheKey);
+        if (cachedUntil !== undefined && Date.now() < cachedUntil) {
+            return false;
+        }
+
+        return this.evaluateNotify(this.loadState(), image, currentTag, latestVersion, Date.now());
+    }
+
+    /**
+     * Évalue la décision de notification à partir d'un instantané d'état
+     * déjà chargé et d'une horloge déjà lue
+     * @param {Object} state - Instantané de l'état
+     * @param {string} image - Nom de l'image Docker (sans tag)
+     * @param {string} currentTag - Tag actuel de l'image
+     * @param {string} latestVersion - Dernière version disponible
+     * @param {number} nowMs - Horloge courante en millisecondes epoch
+     * @returns {boolean} - True si une notification doit être envoyée
+     */
+    evaluateNotify(state, image, currentTag, latestVersion, nowMs) {
         // Si l'image n'est pas dans l'état, on doit notifier
-        if (!state.images[image]) {
-            console.log(`Nouvelle image détectée: ${image}:${currentTag}`);
+        const imageState = state.images[image];
+        if (!imageState) {
+            logVerbose(`Nouvelle image détectée: ${image}:${currentTag}`);
             return true;
         }
-        
-        const imageState = state.images[image];
-        
+
         // Si la dernière version disponible a changé, on doit notifier
         if (imageState.latestVersion !== latestVersion) {
-            console.log(`Nouvelle version disponible pour ${image}: ${latestVersion} (actuelle: ${currentTag})`);
+            logVerbose(`Nouvelle version disponible pour ${image}: ${latestVersion} (actuelle: ${currentTag})`);
             return true;
         }
-        
-        // Si la dernière notification est plus ancienne que la fréquence de notification, on doit notifier
-        const lastNotification = new Date(imageState.lastNotification);
-        const daysSinceLastNotification = Math.floor((now - lastNotification) / (1000 * 60 * 60 * 24));
-        
-        if (daysSinceLastNotification >= this.notificationFrequency) {
-            console.log(`Délai de notification atteint pour ${image}:${currentTag} (${daysSinceLastNotification} jours)`);
+
+        // Si l'échéance du prochain rappel (précalculée à l'écriture) est
+        // passée, on doit notifier
+        const lastNotification = parseIsoMs(imageState.lastNotification);
+        const daysSinceLastNotification = Math.floor((nowMs - lastNotification) / (1000 * 60 * 60 * 24));
+        const nextNotification = this.nextNotificationMs(imageState);
+
+        if (nowMs >= nextNotification) {
+            logVerbose(`Délai de notification atteint pour ${image}:${currentTag} (${daysSinceLastNotification} jours)`);
             return true;
         }
-        
-        console.log(`Pas de notification nécessaire pour ${image}:${currentTag} (dernière: il y a ${daysSinceLastNotification} jours)`);
+
+        logVerbose(`Pas de notification nécessaire pour ${image}:${currentTag} (dernière: il y a ${daysSinceLastNotification} jours)`);
+
+        // Réponse négative mémorisée jusqu'à l'échéance du rappel
+        this.notifyCache.set(`${image}|${latestVersion}`, nextNotification);
         return false;
     }
+
+    /**
+     * Filtre en lot les mises à jour candidates devant être notifiées,
+     * avec un seul chargement de l'état et une seule lecture de l'horloge
+     * @param {Array} candidates - Mises à jour candidates
+     * @returns {Array} - Sous-ensemble des candidates à notifier
+     */
+    filterNotifiable(candidates) {
+        if (candidates.length === 0) {
+            return candidates;
+        }
+
+        const state = this.loadState();
+        const nowMs = Date.now();
+
+        return candidates.filter(candidate =>
+            this.evaluateNotify(state, candidate.image, candidate.currentTag, candidate.latestVersion, nowMs)
+        );
+    }
     
     /**
      * Met à jour l'état d'une image après notification
@@ -116,25 +297,72 @@ class StateService {
      */
     updateImageState(image, imageInfo) {
         const state = this.loadState();
-        const now = new Date();
-        
-        // Mise à jour ou création de l'état de l'image
+
+        // Horodatage calculé une seule fois pour les trois champs
+        const nowMs = Date.now();
+        const nowIso = new Date(nowMs).toISOString();
+
+        // Mise à jour ou création de l'état de l'image, avec l'échéance du
+        // prochain rappel précalculée pour les lectures suivantes.
+        // Champs énumérés explicitement (même forme que updateImageStates):
+        // tous les enregistrements partagent ainsi la même structure interne
         state.images[image] = {
-            ...imageInfo,
-            lastCheck: now.toISOString(),
-            lastNotification: now.toISOString()
+            containerName: imageInfo.containerName,
+            image: imageInfo.image,
+            currentTag: imageInfo.currentTag,
+            latestVersion: imageInfo.latestVersion,
+            lastUpdated: imageInfo.lastUpdated,
+            lastCheck: nowIso,
+            lastNotification: nowIso,
+            nextNotification: nowMs + this.notificationFrequencyMs
         };
-        
+
         // Mise à jour de la date de dernière vérification globale
-        state.lastCheck = now.toISOString();
+        state.lastCheck = nowIso;
         
-        // Sauvegarde de l'état
+        // Sauvegarde de l'état et invalidation du cache de notifications
         this.saveState(state);
-        console.log(`État mis à jour pour ${image}`);
+        this.notifyCache.clear();
+        logVerbose(`État mis à jour pour ${image}`);
     }
     
     /**
-     * 
+     * Met à jour l'état de plusieurs images en une seule écriture
+     * @param {Array} updates - Liste des mises à jour notifiées
+     */
+    updateImageStates(updates) {
+        if (updates.length === 0) {
+            return;
+        }
+
+        const state = this.loadState();
+        const nowMs = Date.now();
+        const nowIso = new Date(nowMs).toISOString();
+        const nextNotificationMs = nowMs + this.notificationFrequencyMs;
+
+        // Un seul chargement et une seule sauvegarde pour tout le lot,
+        // au lieu d'un cycle lecture/écriture par image
+        for (const update of updates) {
+            state.images[update.image] = {
+                containerName: update.containerName,
+                image: update.image,
+                currentTag: update.currentTag,
+                latestVersion: update.latestVersion,
+                lastUpdated: update.lastUpdated,
+                lastCheck: nowIso,
+                lastNotification: nowIso,
+                nextNotification: nextNotificationMs
+            };
+        }
+
+        state.lastCheck = nowIso;
+        this.saveState(state);
+        this.notifyCache.clear();
+        console.log(`État mis à jour pour ${updates.length} image(s)`);
+    }
+
+    /**
+     *
      * Nettoie les images qui ne sont plus en cours d'exécution
      * @param {Array} runningImages - Liste des noms d'images en cours d'exécution
      */
@@ -142,12 +370,15 @@ class StateService {
         const state = this.loadState();
         const imageNames = Object.keys(state.images);
         let changed = false;
-        
+
+        // Recherche en O(1) par image plutôt qu'un parcours de liste par entrée
+        const runningSet = new Set(runningImages);
+
         // Parcourir toutes les images dans l'état
         for (const imageName of imageNames) {
             // Si l'image n'est plus en cours d'exécution, la supprimer
-            if (!runningImages.includes(imageName)) {
-                console.log(`Suppression de l'image inactive: ${imageName}`);
+            if (!runningSet.has(imageName)) {
+                logVerbose(`Suppression de l'image inactive: ${imageName}`);
                 delete state.images[imageName];
                 changed = true;
             }
@@ -157,6 +388,7 @@ class StateService {
         if (changed) {
             state.lastCheck = new Date().toISOString();
             this.saveState(state);
+            this.notifyCache.clear();
         }
     }
 }